@@ -1,23 +1,111 @@
-import operator
-from functools import reduce
+from functools import lru_cache
+from weakref import WeakKeyDictionary
 
+from django.conf import settings
 from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
 from django.db import models
 from django.db.models.constants import LOOKUP_SEP
 from django.template import loader
 from django.utils.encoding import force_str
-from django.utils.translation import gettext_lazy as _
+from django.utils.translation import get_language, gettext_lazy as _
 
 from rest_framework.compat import coreapi, coreschema
 from rest_framework.fields import CharField
 from rest_framework.filters import search_smart_split, BaseFilterBackend
 from rest_framework.settings import api_settings
 
+# Fields of each serializer class, as (orm_source, label, write_only, source) tuples,
+# or None when the serializer class can not be built without a request.
+_SERIALIZER_FIELDS_CACHE = WeakKeyDictionary()
+# Names of the `property` attributes per model class.
+_MODEL_PROPERTY_NAMES_CACHE = WeakKeyDictionary()
+# Templates loaded by the filters `to_html`, keyed by template name.
+_TEMPLATE_CACHE = {}
+# Options rendered by `ConditionalFilter.to_html`, keyed by language and valid fields.
+_TEMPLATE_OPTIONS_CACHE = {}
+# Field used to clean the search terms, validation does not keep any state on it.
+_SEARCH_TERMS_FIELD = CharField(trim_whitespace=False, allow_blank=True)
+
+
+def _get_model_property_names(model_class):
+    """
+    Return a frozenset with the names of the `property` attributes of the
+    model class, including the inherited ones.
+    """
+    property_names = _MODEL_PROPERTY_NAMES_CACHE.get(model_class)
+    if property_names is None:
+        attrs = {}
+        for klass in model_class.__mro__:
+            for attr, value in vars(klass).items():
+                # The closest class in the MRO wins, like on attribute lookup.
+                attrs.setdefault(attr, value)
+        property_names = frozenset(
+            # 'pk' is a property added in Django's Model class, however it is valid for conditional.
+            attr for attr, value in attrs.items() if isinstance(value, property) and attr != 'pk'
+        )
+        _MODEL_PROPERTY_NAMES_CACHE[model_class] = property_names
+    return property_names
+
+
+def _get_serializer_fields(serializer_class, context):
+    """
+    Instantiate the serializer class and return the metadata of its fields.
+    """
+    return tuple(
+        (
+            field.source.replace('.', '__') or field_name,
+            field.label,
+            getattr(field, 'write_only', False),
+            field.source,
+        )
+        for field_name, field in serializer_class(context=context).fields.items()
+    )
+
+
+def _get_cached_serializer_fields(serializer_class):
+    """
+    Return the metadata of the fields of the serializer class built once with
+    an empty context, or None when it can not be built without a request.
+    """
+    try:
+        return _SERIALIZER_FIELDS_CACHE[serializer_class]
+    except KeyError:
+        pass
+    try:
+        serializer_fields = _get_serializer_fields(serializer_class, {})
+    except Exception:
+        # The serializer needs the context, eg. it reads `self.context['request']`.
+        serializer_fields = None
+    _SERIALIZER_FIELDS_CACHE[serializer_class] = serializer_fields
+    return serializer_fields
+
+
+# The search fields may come from the request, so their caches are bounded.
+@lru_cache(maxsize=1024)
+def _get_search_lookup(filter_class, model_class, field_name):
+    """
+    Return the ORM lookup built by the filter class for the field name.
+    """
+    return filter_class()._construct_search(field_name, model_class)
+
+
+@lru_cache(maxsize=1024)
+def _get_search_must_call_distinct(filter_class, model_class, field_name):
+    """
+    Return whether the field name spans a m2m relation, for the filter class.
+    """
+    return filter_class()._must_call_distinct(model_class, field_name)
+
 
 class ConditionalFilter(BaseFilterBackend):
     # The URL query parameter used for the conditional.
     conditional_param = 'conditional'
     conditional_fields = None
+    # The serializer fields are built once per serializer class without any
+    # context, or on every request when that fails. Serializers that change
+    # them based on the request need this set to always build them on every
+    # request, with the request context.
+    disable_field_cache = False
     conditional_title = _('Conditional')
     conditional_description = _('Which field to use when conditional the results.')
     template = 'rest_framework/filters/ordering.html'
@@ -29,7 +117,19 @@ class ConditionalFilter(BaseFilterBackend):
         The `conditional` query parameter can be overridden by setting
         the `conditional_param` value on the ConditionalFilter or by
         specifying an `ORDERING_PARAM` value in the API settings.
+
+        The conditional is parsed once per request and reused by the other
+        calls made while handling it.
         """
+        cache = getattr(request, '_conditional_cache', None)
+        if cache is None:
+            cache = request._conditional_cache = {}
+        key = (self.__class__, view.__class__)
+        if key not in cache:
+            cache[key] = self._get_conditional(request, queryset, view)
+        return cache[key]
+
+    def _get_conditional(self, request, queryset, view):
         params = request.query_params.get(self.conditional_param)
         if params:
             fields = [param.strip() for param in params.split(',')]
@@ -68,23 +168,44 @@ class ConditionalFilter(BaseFilterBackend):
             )
             raise ImproperlyConfigured(msg % self.__class__.__name__)
 
-        model_class = queryset.model
-        model_property_names = [
-            # 'pk' is a property added in Django's Model class, however it is valid for conditional.
-            attr for attr in dir(model_class) if isinstance(getattr(model_class, attr), property) and attr != 'pk'
-        ]
+        serializer_fields = None
+        if not getattr(view, 'disable_field_cache', self.disable_field_cache):
+            # The serializer fields are only built once per serializer class,
+            # with an empty context so they do not depend on the first request.
+            serializer_fields = _get_cached_serializer_fields(serializer_class)
+        if serializer_fields is None:
+            serializer_fields = _get_serializer_fields(serializer_class, context)
+
+        model_property_names = _get_model_property_names(queryset.model)
 
         return [
-            (field.source.replace('.', '__') or field_name, field.label)
-            for field_name, field in serializer_class(context=context).fields.items()
+            (orm_source, label)
+            for orm_source, label, write_only, source in serializer_fields
             if (
-                not getattr(field, 'write_only', False) and
-                not field.source == '*' and
-                field.source not in model_property_names
+                not write_only and
+                not source == '*' and
+                source not in model_property_names
             )
         ]
 
     def get_valid_fields(self, queryset, view, context={}):
+        """
+        Valid fields are resolved once per request, when the `request` is in
+        the context, and reused by the other calls made while handling it.
+        """
+        request = context.get('request')
+        if request is None:
+            return self._get_valid_fields(queryset, view, context)
+
+        cache = getattr(request, '_conditional_valid_fields', None)
+        if cache is None:
+            cache = request._conditional_valid_fields = {}
+        key = (self.__class__, view.__class__, queryset.model)
+        if key not in cache:
+            cache[key] = self._get_valid_fields(queryset, view, context)
+        return cache[key]
+
+    def _get_valid_fields(self, queryset, view, context):
         valid_fields = getattr(view, 'conditional_fields', self.conditional_fields)
 
         if valid_fields is None:
@@ -94,12 +215,12 @@ class ConditionalFilter(BaseFilterBackend):
         elif valid_fields == '__all__':
             # View explicitly allows filtering on any model field
             valid_fields = [
-                (field.name, field.verbose_name) for field in queryset.model._meta.fields
+                (field.name, field.verbose_name) for field in queryset.model._meta.concrete_fields
             ]
-            valid_fields += [
+            valid_fields.extend(
                 (key, key.title().split('__'))
                 for key in queryset.query.annotations
-            ]
+            )
         else:
             valid_fields = [
                 (item, item) if isinstance(item, str) else item
@@ -109,47 +230,76 @@ class ConditionalFilter(BaseFilterBackend):
         return valid_fields
 
     def remove_invalid_fields(self, queryset, fields, view, request):
-        valid_fields = [item[0] for item in self.get_valid_fields(
-            queryset, view, {'request': request})]
+        valid_fields = {item[0] for item in self.get_valid_fields(
+            queryset, view, {'request': request})}
 
-        def term_valid(term):
-            if term.startswith("-"):
-                term = term[1:]
-            return term in valid_fields
-
-        return [term for term in fields if term_valid(term)]
+        return [
+            term for term in fields
+            if (term[1:] if term.startswith('-') else term) in valid_fields
+        ]
 
     def filter_queryset(self, request, queryset, view):
         conditional = self.get_conditional(request, queryset, view)
 
         if conditional:
-            conditions = []
+            conditions = {}
             for condition in conditional:
                 value = True
                 if condition[0] == '-':
                     value = False
                     condition = condition[1:]
-                conditions.append(models.Q(**{'{}__exact'.format(condition): value}))
-            queryset = queryset.filter(reduce(operator.and_, conditions))
+                if conditions.setdefault(condition, value) != value:
+                    # The same field is required to be both true and false.
+                    return queryset.none()
+            queryset = queryset.filter(**conditions)
         return queryset
 
     def get_template_context(self, request, queryset, view):
+        valid_fields = self.get_valid_fields(queryset, view, {'request': request})
         current = self.get_conditional(request, queryset, view)
         current = None if not current else current[0]
-        options = []
         context = {
             'request': request,
             'current': current,
             'param': self.conditional_param,
         }
-        for key, label in self.get_valid_fields(queryset, view, context):
-            options.append((key, '%s - %s' % (label, _('true'))))
-            options.append(('-' + key, '%s - %s' % (label, _('false'))))
-        context['options'] = options
+        context['options'] = self.get_template_options(valid_fields)
         return context
 
+    def get_template_options(self, valid_fields):
+        """
+        Return the true and false options of each valid field. The labels are
+        still resolved on every call, to key the cache, but the translated
+        'true' and 'false' and the formatted options are cached per active
+        language and valid fields.
+        """
+        valid_fields = tuple((key, str(label)) for key, label in valid_fields)
+        cache_key = (get_language(), valid_fields)
+        options = _TEMPLATE_OPTIONS_CACHE.get(cache_key)
+        if options is None:
+            true, false = str(_('true')), str(_('false'))
+            options = []
+            for key, label in valid_fields:
+                options.append((key, f'{label} - {true}'))
+                options.append((f'-{key}', f'{label} - {false}'))
+            options = _TEMPLATE_OPTIONS_CACHE[cache_key] = tuple(options)
+        return list(options)
+
+    def get_template(self):
+        """
+        Return the template used by `to_html`. It is loaded once per template
+        name, except with DEBUG enabled so changes to it are picked up.
+        """
+        if settings.DEBUG:
+            return loader.get_template(self.template)
+        template = _TEMPLATE_CACHE.get(self.template)
+        if template is None:
+            template = loader.get_template(self.template)
+            _TEMPLATE_CACHE[self.template] = template
+        return template
+
     def to_html(self, request, queryset, view):
-        template = loader.get_template(self.template)
+        template = self.get_template()
         context = self.get_template_context(request, queryset, view)
         return template.render(context)
 
@@ -209,17 +359,26 @@ class FieldsFilter(BaseFilterBackend):
         and may be whitespace delimited.
         """
         value = request.query_params.get(field_param, '')
-        field = CharField(trim_whitespace=False, allow_blank=True)
-        cleaned_value = field.run_validation(value)
+        cleaned_value = _SEARCH_TERMS_FIELD.run_validation(value)
         return search_smart_split(cleaned_value)
 
     def construct_search(self, field_name, queryset):
-        lookup = self.lookup_prefixes.get(field_name[0])
+        """
+        Return the ORM lookup for the given field name. The result only
+        depends on the model, so it is computed once per field name.
+        """
+        return _get_search_lookup(self.__class__, queryset.model, field_name)
+
+    def _construct_search(self, field_name, model):
+        lookup = self.lookup_prefixes.get(field_name[:1])
         if lookup:
             field_name = field_name[1:]
+        elif LOOKUP_SEP not in field_name:
+            # A plain field name can not include a lookup, use icontains.
+            lookup = 'icontains'
         else:
             # Use field_name if it includes a lookup.
-            opts = queryset.model._meta
+            opts = model._meta
             lookup_fields = field_name.split(LOOKUP_SEP)
             # Go through the fields, following all relations.
             prev_field = None
@@ -239,33 +398,43 @@ class FieldsFilter(BaseFilterBackend):
                         opts = field.path_infos[-1].to_opts
             # Otherwise, use the field with icontains.
             lookup = 'icontains'
-        return LOOKUP_SEP.join([field_name, lookup])
+        return f'{field_name}{LOOKUP_SEP}{lookup}'
 
     def must_call_distinct(self, queryset, search_fields):
         """
         Return True if 'distinct()' should be used to query the given lookups.
         """
         for search_field in search_fields:
-            opts = queryset.model._meta
             if search_field[0] in self.lookup_prefixes:
                 search_field = search_field[1:]
             # Annotated fields do not need to be distinct
             if isinstance(queryset, models.QuerySet) and search_field in queryset.query.annotations:
                 continue
-            parts = search_field.split(LOOKUP_SEP)
-            print(parts)
-            for part in parts:
+            if _get_search_must_call_distinct(self.__class__, queryset.model, search_field):
+                return True
+        return False
+
+    def _must_call_distinct(self, model, search_field):
+        opts = model._meta
+        parts = search_field.split(LOOKUP_SEP)
+        for part in parts:
+            if part == 'pk':
+                part = opts.pk.name
+            try:
                 field = opts.get_field(part)
-                if hasattr(field, 'get_path_info'):
-                    # This field is a relation, update opts to follow the relation
-                    path_info = field.get_path_info()
-                    opts = path_info[-1].to_opts
-                    if any(path.m2m for path in path_info):
-                        # This field is a m2m relation so we know we need to call distinct
-                        return True
-                else:
-                    # This field has a custom __ query transform but is not a relational field.
-                    break
+            except FieldDoesNotExist:
+                # This part is a query lookup, the fields before it were walked already.
+                break
+            if hasattr(field, 'get_path_info'):
+                # This field is a relation, update opts to follow the relation
+                path_info = field.get_path_info()
+                opts = path_info[-1].to_opts
+                if any(path.m2m for path in path_info):
+                    # This field is a m2m relation so we know we need to call distinct
+                    return True
+            else:
+                # This field has a custom __ query transform but is not a relational field.
+                break
         return False
 
     def filter_queryset(self, request, queryset, view):
@@ -275,6 +444,7 @@ class FieldsFilter(BaseFilterBackend):
             return queryset
 
         base = queryset
+        filtered_fields = []
 
         for field in search_fields:
 
@@ -282,20 +452,21 @@ class FieldsFilter(BaseFilterBackend):
             if not search_terms:
                 continue
 
-            orm_lookups = [
-                self.construct_search(str(field), queryset)
-            ]
-
-            print(orm_lookups)
-
-            # generator which for each term builds the corresponding search
-            conditions = (
-                reduce(
-                    operator.or_,
-                    (models.Q(**{orm_lookup: term}) for orm_lookup in orm_lookups)
-                ) for term in search_terms
-            )
-            queryset = queryset.filter(reduce(operator.and_, conditions))
+            orm_lookup = self.construct_search(field, queryset)
+
+            # every term must match the lookup
+            conditions = None
+            for term in search_terms:
+                condition = models.Q(**{orm_lookup: term})
+                conditions = condition if conditions is None else conditions & condition
+            queryset = queryset.filter(conditions)
+            filtered_fields.append(field)
+
+        if filtered_fields and self.must_call_distinct(queryset, filtered_fields):
+            # Filtering across a m2m relation can return the same row more than
+            # once, keep the rows of `base` that have a match instead.
+            queryset = queryset.filter(pk=models.OuterRef('pk'))
+            queryset = base.filter(models.Exists(queryset))
         return queryset
 
     def get_schema_fields(self, view):
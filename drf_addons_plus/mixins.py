@@ -1,10 +1,82 @@
+from weakref import WeakKeyDictionary
+
+from rest_framework.fields import BooleanField, CharField, FloatField, IntegerField
 from rest_framework.response import Response
 
+# Serializer fields whose representation is the value read from the database.
+_PLAIN_FIELD_CLASSES = (BooleanField, CharField, FloatField, IntegerField)
+# Names of the readable fields of each serializer class, and of the plain ones
+# among them, or None when the serializer class can not be built without a request.
+_SERIALIZER_FIELD_NAMES_CACHE = WeakKeyDictionary()
+
+
+def _get_field_names(fields):
+    """
+    Return the names of the readable serializer fields, and a frozenset with
+    the ones that are plain fields with the same name and source.
+    """
+    fields = [(field_name, field) for field_name, field in fields.items() if not field.write_only]
+    return (
+        tuple(field_name for field_name, field in fields),
+        frozenset(
+            field_name for field_name, field in fields
+            if field.source == field_name and isinstance(field, _PLAIN_FIELD_CLASSES)
+        ),
+    )
+
+
+def _get_cached_field_names(serializer_class):
+    """
+    Return the field names of the serializer class built once with an empty
+    context, or None when it can not be built without a request.
+    """
+    try:
+        return _SERIALIZER_FIELD_NAMES_CACHE[serializer_class]
+    except KeyError:
+        pass
+    try:
+        field_names = _get_field_names(serializer_class(context={}).fields)
+    except Exception:
+        # The serializer needs the context, eg. it reads `self.context['request']`.
+        field_names = None
+    _SERIALIZER_FIELD_NAMES_CACHE[serializer_class] = field_names
+    return field_names
+
 
 class ListFieldsModelMixin:
     """
     List a queryset with selected fields.
     """
+    # Model fields that can be read with `.values()`. When every listed field
+    # is one of them, and its serializer field is a boolean, char, float or
+    # integer field with the same name and source, the serializer is skipped.
+    values_fields = None
+
+    def get_values_fields(self, queryset, fields):
+        """
+        Return the fields to read with `.values()`, or None when the
+        serializer is needed to represent them.
+        """
+        if not self.values_fields:
+            return None
+        if queryset.query.distinct or queryset.query.combinator:
+            # Reading less columns would merge the rows that only differ on the others.
+            return None
+
+        field_names = None
+        if not getattr(self, 'disable_field_cache', False):
+            field_names = _get_cached_field_names(self.get_serializer_class())
+        if field_names is None:
+            # The fields may depend on the request, use the ones it would render.
+            field_names = _get_field_names(self.get_serializer(fields=fields).fields)
+        readable_names, plain_names = field_names
+        if fields is None:
+            fields = readable_names
+        fields = list(dict.fromkeys(fields))
+        if fields and plain_names.issuperset(fields) and set(fields).issubset(self.values_fields):
+            return fields
+        return None
+
     def list(self, request, *args, **kwargs):
         queryset = self.filter_queryset(self.get_queryset())
 
@@ -12,10 +84,18 @@ class ListFieldsModelMixin:
         if fields:
             fields = fields.split(',')
 
+        values_fields = self.get_values_fields(queryset, fields)
+        if values_fields:
+            queryset = queryset.values(*values_fields)
+
         page = self.paginate_queryset(queryset)
         if page is not None:
+            if values_fields:
+                return self.get_paginated_response(list(page))
             serializer = self.get_serializer(page, many=True, fields=fields)
             return self.get_paginated_response(serializer.data)
 
+        if values_fields:
+            return Response(list(queryset))
         serializer = self.get_serializer(queryset, many=True, fields=fields)
         return Response(serializer.data)